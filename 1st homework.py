@@ -1,6 +1,5 @@
 import requests
 import io
-import pandas as pd
 from abc import ABC, abstractmethod
 from requests.exceptions import HTTPError
 
@@ -49,6 +48,8 @@ class Loader(Model):
             return self.response
 
     def save_dict(self):
+        import pandas as pd
+
         buffer = io.BytesIO
         df = pd.read_excel(buffer(self.response.content))
         result = df.to_dict(orient='dict')
@@ -56,9 +57,10 @@ class Loader(Model):
         return result
 
 
-loader = Loader()
-loader.download(100, 10000)
-loader.save_dict()
+if __name__ == "__main__":
+    loader = Loader()
+    loader.download(100, 10000)
+    loader.save_dict()
 
 
 
@@ -1,8 +1,6 @@
 import asyncio
 import io
 import requests
-import pandas as pd
-import numpy as np
 from abc import ABC, abstractmethod
 
 
@@ -29,6 +27,7 @@ class Loader(Model):
         return cls._instance
 
     async def download_async(self, skip, categories):
+        import numpy as np
 
         batch_size = min(len(categories), 3)
         category_batches = np.array_split(np.array(categories), batch_size)
@@ -66,6 +65,8 @@ class Loader(Model):
             return b''
 
     def save_dict(self, data_list):
+        import pandas as pd
+
         results = []
         for data in data_list:
             if len(data) > 0:
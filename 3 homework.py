@@ -1,9 +1,7 @@
 import asyncio
 import time
-import numpy as np
 import requests
 import io
-import pandas as pd
 import concurrent.futures
 from abc import ABC, abstractmethod
 
@@ -30,6 +28,8 @@ class Loader(Model):
         return cls._instance
 
     def start(self):
+        import numpy as np
+
         with concurrent.futures.ThreadPoolExecutor() as pool:
             pool.map(self.export_batch, np.array_split(range(0, 100), 10))
 
@@ -81,6 +81,8 @@ class Loader(Model):
             return b''
 
     def save_dict(self, data_list):
+        import pandas as pd
+
         results = []
         for data in data_list:
             if len(data) > 0:
@@ -92,5 +94,6 @@ class Loader(Model):
         return results
 
 
-loader = Loader()
-loader.start()
+if __name__ == "__main__":
+    loader = Loader()
+    loader.start()
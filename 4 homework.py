@@ -1,6 +1,5 @@
 import datetime
 import random
-from faker import Faker
 from sqlalchemy import create_engine, text, func
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Mapped, mapped_column
 from typing import Annotated
@@ -87,6 +86,8 @@ class Goods(BaseTable):
 
 
 def seed_database(session, num_entries=20):
+    from faker import Faker
+
     fake = Faker('ru_RU')
     print(f"Add {num_entries} random strings...")
     for _ in range(num_entries):
@@ -105,27 +106,28 @@ def display_data(session, table_class):
     print("-" * 20)
 
 
-try:
-    conn_params = Connection(
-            server="localhost",
-            port=5432,
-            user="postgres",
-            password="password",
-            db_name="synergy",
-            sql_type="PostgresSQL"
-    )
-    session_builder = SessionBuilder(conn_params)
-    engine = session_builder.engine
-
-    BaseTable.metadata.create_all(engine)
-
-    db_session = session_builder.build()
-    seed_database(db_session, num_entries=10)
-    display_data(db_session, Suppliers)
-    display_data(db_session, Goods)
-    display_data(db_session, Orders)
-    db_session.close()
-except ValueError as e:
-    print(f"Value error: {e}")
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    try:
+        conn_params = Connection(
+                server="localhost",
+                port=5432,
+                user="postgres",
+                password="password",
+                db_name="synergy",
+                sql_type="PostgresSQL"
+        )
+        session_builder = SessionBuilder(conn_params)
+        engine = session_builder.engine
+
+        BaseTable.metadata.create_all(engine)
+
+        db_session = session_builder.build()
+        seed_database(db_session, num_entries=10)
+        display_data(db_session, Suppliers)
+        display_data(db_session, Goods)
+        display_data(db_session, Orders)
+        db_session.close()
+    except ValueError as e:
+        print(f"Value error: {e}")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -1,10 +1,15 @@
+import csv
 import datetime
 import asyncio
-from sqlalchemy import create_engine, text, func, ForeignKey, String
+import io
+import time
+from sqlalchemy import (create_engine, text, func, ForeignKey, String,
+                        BigInteger, inspect, insert, select, update)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import (sessionmaker, DeclarativeBase, Mapped,
                             mapped_column, relationship)
 from typing import Annotated, List
-from parsing import load_and_transform_data
+from parsing import load_and_transform_data, validate_niche_batch
 from pydantic import BaseModel
 
 
@@ -74,7 +79,7 @@ class Suppliers(BaseTable):
     __tablename__ = "Suppliers"
 
     ID: Mapped[BaseTable.type_annotation_map['IID']]
-    SupplierName: Mapped[str]
+    SupplierName: Mapped[str] = mapped_column(unique=True, index=True)
     CreatedOn: Mapped[BaseTable.type_annotation_map['CreatedOn']]
     UpdatedAt: Mapped[BaseTable.type_annotation_map['UpdatedAt']]
     goods: Mapped[List["Goods"]] = relationship(back_populates="supplier")
@@ -95,11 +100,14 @@ class Goods(BaseTable):
     Price: Mapped[int]
     CreatedOn: Mapped[BaseTable.type_annotation_map["CreatedOn"]]
     UpdatedAt: Mapped[BaseTable.type_annotation_map["UpdatedAt"]]
-    supplier_id: Mapped[int] = mapped_column(ForeignKey("Suppliers.ID"))
+    supplier_id: Mapped[int] = mapped_column(ForeignKey("Suppliers.ID"),
+                                             index=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("Orders.ID"))
-    sku: Mapped[str] = mapped_column(String(50), comment="SKU артикула")
-    brand: Mapped[str] = mapped_column(comment="Бренд")
-    main_category: Mapped[str] = mapped_column(comment="Основная категория")
+    sku: Mapped[str] = mapped_column(String(50), index=True,
+                                     comment="SKU артикула")
+    brand: Mapped[str] = mapped_column(index=True, comment="Бренд")
+    main_category: Mapped[str] = mapped_column(index=True,
+                                               comment="Основная категория")
     days_on_sale: Mapped[int] = mapped_column(comment="Кол-во дней когда артикул был в продаже")
     days_with_purchases: Mapped[int] = mapped_column(comment="Кол-во дней, когда артикул покупали")
     last_stock_balance: Mapped[int] = mapped_column(comment="Последние остатки на складах")
@@ -109,80 +117,426 @@ class Goods(BaseTable):
     order: Mapped[Orders] = relationship(back_populates="goods")
 
 
+class BrandTurnover(BaseTable):
+    __tablename__ = "BrandTurnover"
+
+    brand: Mapped[str] = mapped_column(primary_key=True, comment="Бренд")
+    turnover: Mapped[int] = mapped_column(BigInteger, index=True,
+                                          comment="Оборот FBO + FBS")
+    orders_count: Mapped[int] = mapped_column(BigInteger,
+                                              comment="Кол-во заказов")
+    goods_count: Mapped[int] = mapped_column(comment="Кол-во артикулов")
+    UpdatedAt: Mapped[BaseTable.type_annotation_map["UpdatedAt"]]
+
+
+class CategoryMissedRevenue(BaseTable):
+    __tablename__ = "CategoryMissedRevenue"
+
+    main_category: Mapped[str] = mapped_column(primary_key=True,
+                                               comment="Основная категория")
+    missed_revenue: Mapped[int] = mapped_column(BigInteger,
+                                                comment="Упущенная выгода")
+    missed_revenue_percent_sum: Mapped[float] = mapped_column(
+        comment="Сумма упущенной выгоды в процентах")
+    missed_revenue_percent: Mapped[float] = mapped_column(
+        index=True, comment="Средняя упущенная выгода в процентах")
+    goods_count: Mapped[int] = mapped_column(comment="Кол-во артикулов")
+    UpdatedAt: Mapped[BaseTable.type_annotation_map["UpdatedAt"]]
+
+
+class SupplierLeaderboard(BaseTable):
+    __tablename__ = "SupplierLeaderboard"
+
+    supplier_id: Mapped[int] = mapped_column(ForeignKey("Suppliers.ID"),
+                                             primary_key=True)
+    supplier_name: Mapped[str] = mapped_column(comment="Продавец")
+    turnover: Mapped[int] = mapped_column(BigInteger, index=True,
+                                          comment="Оборот FBO + FBS")
+    orders_count: Mapped[int] = mapped_column(BigInteger,
+                                              comment="Кол-во заказов")
+    goods_count: Mapped[int] = mapped_column(comment="Кол-во артикулов")
+    UpdatedAt: Mapped[BaseTable.type_annotation_map["UpdatedAt"]]
+
+
+def create_schema(engine):
+    BaseTable.metadata.create_all(engine)
+    for table in BaseTable.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _upsert_summary(session, table_class, key, rows, increments,
+                    derived=None):
+    table = table_class.__table__
+    rows = sorted(rows, key=lambda row: row[key])
+    if not rows:
+        return
+
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        statement = pg_insert(table)
+        added = {name: statement.excluded[name] for name in increments}
+        values = {name: table.c[name] + added[name] for name in increments}
+        if derived is not None:
+            values.update(derived(table, added))
+        values["UpdatedAt"] = func.now()
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[key], set_=values), rows)
+        return
+
+    for row in rows:
+        values = {name: table.c[name] + row[name] for name in increments}
+        if derived is not None:
+            values.update(derived(table, row))
+        values["UpdatedAt"] = func.now()
+        changed = update(table).where(table.c[key] == row[key]).values(values)
+        if session.execute(changed).rowcount:
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(insert(table).values(row))
+        except IntegrityError:
+            session.execute(changed)
+
+
+def _average_missed_revenue_percent(table, added):
+    return {"missed_revenue_percent":
+            (table.c.missed_revenue_percent_sum
+             + added["missed_revenue_percent_sum"])
+            / (table.c.goods_count + added["goods_count"])}
+
+
+def refresh_aggregates(session, ingested):
+    brands = {}
+    categories = {}
+    sellers = {}
+
+    for supplier, order, good in ingested:
+        turnover = order.turnover_fbo + order.turnover_fbs
+
+        brand = brands.setdefault(good.brand, {
+            "brand": good.brand, "turnover": 0, "orders_count": 0,
+            "goods_count": 0})
+        brand["turnover"] += turnover
+        brand["orders_count"] += order.total_orders_count
+        brand["goods_count"] += 1
+
+        category = categories.setdefault(good.main_category, {
+            "main_category": good.main_category, "missed_revenue": 0,
+            "missed_revenue_percent_sum": 0.0, "goods_count": 0})
+        category["missed_revenue"] += order.missed_revenue
+        category["missed_revenue_percent_sum"] += good.missed_revenue_percent
+        category["goods_count"] += 1
+
+        seller = sellers.setdefault(supplier.ID, {
+            "supplier_id": supplier.ID, "supplier_name": supplier.SupplierName,
+            "turnover": 0, "orders_count": 0, "goods_count": 0})
+        seller["turnover"] += turnover
+        seller["orders_count"] += order.total_orders_count
+        seller["goods_count"] += 1
+
+    for category in categories.values():
+        category["missed_revenue_percent"] = (
+            category["missed_revenue_percent_sum"] / category["goods_count"])
+
+    _upsert_summary(session, BrandTurnover, "brand", brands.values(),
+                    ["turnover", "orders_count", "goods_count"])
+    _upsert_summary(session, CategoryMissedRevenue, "main_category",
+                    categories.values(),
+                    ["missed_revenue", "missed_revenue_percent_sum",
+                     "goods_count"],
+                    derived=_average_missed_revenue_percent)
+    _upsert_summary(session, SupplierLeaderboard, "supplier_id",
+                    sellers.values(),
+                    ["turnover", "orders_count", "goods_count"])
+
+
+def ensure_suppliers(session, names):
+    if not names:
+        return {}
+    values = [{"SupplierName": name} for name in sorted(names)]
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        session.execute(pg_insert(Suppliers.__table__).values(values)
+                        .on_conflict_do_nothing(
+                            index_elements=["SupplierName"]))
+    else:
+        known = {name for (name,) in session.query(Suppliers.SupplierName)
+                 .filter(Suppliers.SupplierName.in_(names))}
+        for value in values:
+            if value["SupplierName"] in known:
+                continue
+            try:
+                with session.begin_nested():
+                    session.execute(insert(Suppliers.__table__).values(value))
+            except IntegrityError:
+                pass
+    return {supplier.SupplierName: supplier
+            for supplier in session.query(Suppliers).filter(
+                Suppliers.SupplierName.in_(names))}
+
+
 def populate_db_from_loader(session, data):
     print(
         f"\nНачало сохранения {len(data)} записей в БД с использованием всех доступных столбцов...")
 
-    suppliers_cache = {}
+    rows, report = validate_niche_batch(data)
+    if report["missing_columns"]:
+        print(f"Пропущены все записи из-за отсутствия столбцов: "
+              f"{report['missing_columns']}")
+    elif report["rejected"]:
+        print(f"Пропущено {report['rejected']} из {report['total']} записей "
+              f"из-за ошибок формата данных: {report['invalid']}, "
+              f"строки: {report['sample']}")
 
-    for item_dict in data:
-        try:
-            seller_name = item_dict['Продавец']
-            item_name = item_dict['Название']
-            price = int(item_dict['Цена'])
-            sku_val = str(item_dict['SKU'])
-            brand_val = item_dict['Бренд']
-            category_val = item_dict['Основная категория']
-            days_sale = int(
-                item_dict['Кол-во дней когда артикул был в продаже'])
-            days_purchase = int(
-                item_dict['Кол-во дней, когда артикул покупали'])
-            orders_count = int(item_dict['Кол-во заказов'])
-            turnover_fbo_val = int(item_dict['Оборот FBO'])
-            turnover_fbs_val = int(item_dict['Оборот FBS'])
-            missed_rev_val = int(item_dict['Упущенная выгода'])
-            last_stock = int(item_dict['Последние остатки на складах'])
-            missed_rev_pct = float(item_dict['Упущенная выгода в процентах'])
-            feedback_count_val = int(item_dict['Отзывов'])
-            search_queries_val = int(item_dict['Поисковых запросов'])
-
-        except KeyError as e:
-            print(
-                f"Пропущена запись из-за отсутствия критически важного столбца: {e}")
-            continue
-        except ValueError as e:
-            print(f"Пропущена запись из-за ошибки формата данных: {e}")
-            continue
+    suppliers_cache = ensure_suppliers(
+        session, {row['seller_name'] for row in rows})
+    ingested = []
 
-        if seller_name not in suppliers_cache:
-            supplier = Suppliers(SupplierName=seller_name)
-            session.add(supplier)
-            session.flush()
-            suppliers_cache[seller_name] = supplier
-        else:
-            supplier = suppliers_cache[seller_name]
+    for row in rows:
+        supplier = suppliers_cache[row['seller_name']]
 
-        order_name = f"Order SKU: {sku_val}"
+        order_name = f"Order SKU: {row['sku']}"
         order = Orders(
             OrderName=order_name,
-            Price=price,
-            total_orders_count=orders_count,
-            turnover_fbo=turnover_fbo_val,
-            turnover_fbs=turnover_fbs_val,
-            missed_revenue=missed_rev_val,
-            feedback_count=feedback_count_val
+            Price=row['price'],
+            total_orders_count=row['total_orders_count'],
+            turnover_fbo=row['turnover_fbo'],
+            turnover_fbs=row['turnover_fbs'],
+            missed_revenue=row['missed_revenue'],
+            feedback_count=row['feedback_count']
         )
         session.add(order)
         session.flush()
 
         good = Goods(
-            GoodsName=item_name,
-            Price=price,
+            GoodsName=row['item_name'],
+            Price=row['price'],
             supplier_id=supplier.ID,
             order_id=order.ID,
-            sku=sku_val,
-            brand=brand_val,
-            main_category=category_val,
-            days_on_sale=days_sale,
-            days_with_purchases=days_purchase,
-            last_stock_balance=last_stock,
-            missed_revenue_percent=missed_rev_pct,
-            search_queries=search_queries_val
+            sku=row['sku'],
+            brand=row['brand'],
+            main_category=row['main_category'],
+            days_on_sale=row['days_on_sale'],
+            days_with_purchases=row['days_with_purchases'],
+            last_stock_balance=row['last_stock_balance'],
+            missed_revenue_percent=row['missed_revenue_percent'],
+            search_queries=row['search_queries']
         )
         session.add(good)
+        ingested.append((supplier, order, good))
 
+    refresh_aggregates(session, ingested)
     session.commit()
     print("Сохранение в БД завершено.")
+    return report
+
+
+CATEGORIES = ["Одежда", "Обувь", "Дом", "Кухня", "Красота", "Здоровье",
+              "Детям", "Игрушки", "Электроника", "Бытовая техника",
+              "Спорт", "Автотовары", "Книги", "Канцтовары", "Зоотовары",
+              "Продукты", "Мебель", "Строительство", "Сад", "Аксессуары"]
+
+
+class SyntheticDataGenerator:
+
+    def __init__(self, seed=None, pool_size=5000):
+        import numpy as np
+        from faker import Faker
+
+        self.rng = np.random.default_rng(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.company_pool = np.array(
+            [fake.company() for _ in range(pool_size)], dtype=object)
+        self.goods_pool = np.array(
+            [fake.bs() for _ in range(pool_size)], dtype=object)
+        self.brand_pool = np.array(
+            [fake.word().capitalize() for _ in range(pool_size // 5)],
+            dtype=object)
+        self.categories = np.array(CATEGORIES, dtype=object)
+
+    def _choice(self, pool, size):
+        return pool[self.rng.integers(0, len(pool), size)]
+
+    def suppliers(self, first, size):
+        number = (first + self.rng.permutation(size)).astype(str)
+        return {"SupplierName": self._choice(self.company_pool, size)
+                + " #" + number.astype(object)}
+
+    def orders_and_goods(self, first, size, supplier_ids):
+        rng = self.rng
+        price = rng.lognormal(mean=7.0, sigma=0.8, size=size)
+        price = price.clip(50, 1_000_000).astype("int64")
+        orders_count = rng.poisson(rng.lognormal(2.5, 1.2, size))
+        turnover = (orders_count * price).clip(max=2_000_000_000)
+        turnover_fbo = (turnover * rng.beta(5, 2, size)).astype("int64")
+        missed_percent = (rng.beta(2, 8, size) * 100).round(2)
+        days_on_sale = rng.integers(1, 31, size)
+        sku = (10_000_000 + first + rng.permutation(size)).astype(str)
+        sku = sku.astype(object)
+
+        # Zipf-like skew: a few sellers own most of the assortment.
+        seller = (rng.zipf(1.3, size) - 1) % len(supplier_ids)
+        orders = {
+            "OrderName": "Order SKU: " + sku,
+            "Price": price,
+            "total_orders_count": orders_count,
+            "turnover_fbo": turnover_fbo,
+            "turnover_fbs": turnover - turnover_fbo,
+            "missed_revenue": (turnover * missed_percent / 100)
+            .astype("int64"),
+            "feedback_count": rng.binomial(orders_count, 0.2),
+        }
+        goods = {
+            "GoodsName": self._choice(self.goods_pool, size),
+            "Price": price,
+            "supplier_id": supplier_ids[seller],
+            "sku": sku,
+            "brand": self._choice(self.brand_pool, size),
+            "main_category": self._choice(self.categories, size),
+            "days_on_sale": days_on_sale,
+            "days_with_purchases": rng.binomial(days_on_sale, 0.6),
+            "last_stock_balance": rng.poisson(50, size),
+            "missed_revenue_percent": missed_percent,
+            "search_queries": rng.poisson(rng.lognormal(4, 1, size)),
+        }
+        return orders, goods
+
+
+def _copy_batch(connection, table_class, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(zip(*(column.tolist() for column in columns.values())))
+    buffer.seek(0)
+    column_names = ", ".join(f'"{name}"' for name in columns)
+    statement = (f'COPY "{table_class.__tablename__}" ({column_names}) '
+                 f"FROM STDIN WITH (FORMAT csv)")
+    with connection.connection.cursor() as cursor:
+        if connection.dialect.driver == "psycopg2":
+            cursor.copy_expert(statement, buffer)
+        else:
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _insert_batch(connection, table_class, columns):
+    rows = [dict(zip(columns, values)) for values in zip(
+        *(column.tolist() for column in columns.values()))]
+    connection.execute(insert(table_class.__table__), rows)
+
+
+def _load_batch(connection, table_class, columns):
+    import numpy as np
+
+    table = table_class.__table__
+    last_id = connection.execute(
+        select(func.coalesce(func.max(table.c.ID), 0))).scalar()
+    use_copy = (connection.dialect.name == "postgresql"
+                and connection.dialect.driver in ("psycopg2", "psycopg"))
+    (_copy_batch if use_copy else _insert_batch)(connection, table_class,
+                                                 columns)
+    ids = connection.execute(select(table.c.ID).where(table.c.ID > last_id)
+                             .order_by(table.c.ID)).scalars().all()
+    return np.array(ids, dtype="int64")
+
+
+def _seed_summaries(session, goods, orders):
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "brand": goods["brand"],
+        "main_category": goods["main_category"],
+        "supplier_id": goods["supplier_id"],
+        "missed_revenue_percent_sum": goods["missed_revenue_percent"],
+        "turnover": orders["turnover_fbo"] + orders["turnover_fbs"],
+        "orders_count": orders["total_orders_count"],
+        "missed_revenue": orders["missed_revenue"],
+        "goods_count": 1,
+    })
+    brands = df.groupby("brand", as_index=False)[
+        ["turnover", "orders_count", "goods_count"]].sum()
+    categories = df.groupby("main_category", as_index=False)[
+        ["missed_revenue", "missed_revenue_percent_sum", "goods_count"]].sum()
+    categories["missed_revenue_percent"] = (
+        categories["missed_revenue_percent_sum"] / categories["goods_count"])
+    sellers = df.groupby("supplier_id", as_index=False)[
+        ["turnover", "orders_count", "goods_count"]].sum()
+    names = dict(session.query(Suppliers.ID, Suppliers.SupplierName).filter(
+        Suppliers.ID.in_(sellers["supplier_id"].tolist())))
+    sellers["supplier_name"] = sellers["supplier_id"].map(names)
+
+    _upsert_summary(session, BrandTurnover, "brand",
+                    brands.to_dict(orient="records"),
+                    ["turnover", "orders_count", "goods_count"])
+    _upsert_summary(session, CategoryMissedRevenue, "main_category",
+                    categories.to_dict(orient="records"),
+                    ["missed_revenue", "missed_revenue_percent_sum",
+                     "goods_count"],
+                    derived=_average_missed_revenue_percent)
+    _upsert_summary(session, SupplierLeaderboard, "supplier_id",
+                    sellers.to_dict(orient="records"),
+                    ["turnover", "orders_count", "goods_count"])
+
+
+def _drop_goods_constraints(connection):
+    foreign_keys = inspect(connection).get_foreign_keys("Goods")
+    for foreign_key in foreign_keys:
+        connection.execute(text(
+            f'ALTER TABLE "Goods" DROP CONSTRAINT "{foreign_key["name"]}"'))
+    for index in Goods.__table__.indexes:
+        index.drop(connection, checkfirst=True)
+    return foreign_keys
+
+
+def _restore_goods_constraints(connection, foreign_keys):
+    for index in Goods.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    for foreign_key in foreign_keys:
+        columns = ", ".join(f'"{name}"'
+                            for name in foreign_key["constrained_columns"])
+        referred = ", ".join(f'"{name}"'
+                             for name in foreign_key["referred_columns"])
+        connection.execute(text(
+            f'ALTER TABLE "Goods" ADD CONSTRAINT "{foreign_key["name"]}" '
+            f'FOREIGN KEY ({columns}) '
+            f'REFERENCES "{foreign_key["referred_table"]}" ({referred})'))
+
+
+def bulk_seed_database(engine, num_entries=1_000_000, batch_size=100_000,
+                       num_suppliers=None, seed=None, defer_indexes=True):
+    generator = SyntheticDataGenerator(seed=seed)
+    num_suppliers = num_suppliers or max(1, num_entries // 100)
+    print(f"Bulk load {num_suppliers} suppliers and {num_entries} "
+          f"orders/goods...")
+    started = time.perf_counter()
+    with sessionmaker(bind=engine)() as session:
+        connection = session.connection()
+        first_supplier = session.query(
+            func.coalesce(func.max(Suppliers.ID), 0)).scalar()
+        supplier_ids = generator.rng.permutation(_load_batch(
+            connection, Suppliers,
+            generator.suppliers(first_supplier, num_suppliers)))
+        defer_indexes = defer_indexes and engine.dialect.name == "postgresql"
+        if defer_indexes:
+            foreign_keys = _drop_goods_constraints(connection)
+        for first in range(0, num_entries, batch_size):
+            size = min(batch_size, num_entries - first)
+            orders, goods = generator.orders_and_goods(first, size,
+                                                       supplier_ids)
+            goods["order_id"] = _load_batch(connection, Orders, orders)
+            _load_batch(connection, Goods, goods)
+            _seed_summaries(session, goods, orders)
+        if defer_indexes:
+            _restore_goods_constraints(connection, foreign_keys)
+        session.commit()
+    elapsed = time.perf_counter() - started
+    total = num_suppliers + num_entries * 2
+    rate = total / elapsed
+    print(f"Loaded {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    return rate
 
 
 def display_data(session, table_class):
@@ -219,7 +573,7 @@ async def main_process():
         session_builder = SessionBuilder(conn_params)
         engine = session_builder.engine
 
-        BaseTable.metadata.create_all(engine)
+        create_schema(engine)
 
         db_session = session_builder.build()
         if transformed_data:
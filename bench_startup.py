@@ -0,0 +1,55 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+MODULES = ["parsing", "cli", "homework_6"]
+
+HEAVY_MODULES = ["pandas", "numpy", "sqlalchemy", "faker", "requests",
+                 "fastapi"]
+
+
+def measure_import(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        package = name.strip()
+        loaded.add(package.split(".")[0])
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return {
+        "module": module,
+        "ok": result.returncode == 0,
+        "total_ms": total_us / 1000,
+        "heavy": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Время импорта модулей по данным python -X importtime.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<12} {'best ms':>10}  heavy imports")
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["total_ms"])
+        status = "" if best["ok"] else "  (import failed)"
+        heavy = ", ".join(best["heavy"]) or "-"
+        print(f"{module:<12} {best['total_ms']:>10.1f}  {heavy}{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import io
+import threading
+from parsing import Loader, NICHE_SCHEMA, validate_niche_batch
+
+
+SAMPLE_ROW = {
+    'Продавец': 'ООО Ромашка',
+    'Название': 'Чайник',
+    'Цена': 1500,
+    'SKU': 123456,
+    'Бренд': 'Ромашка',
+    'Основная категория': 'Кухня',
+    'Кол-во дней когда артикул был в продаже': 30,
+    'Кол-во дней, когда артикул покупали': 12,
+    'Кол-во заказов': 40,
+    'Оборот FBO': 45000,
+    'Оборот FBS': 15000,
+    'Упущенная выгода': 3000,
+    'Последние остатки на складах': 7,
+    'Упущенная выгода в процентах': 4.5,
+    'Отзывов': 18,
+    'Поисковых запросов': 250,
+}
+
+
+def sample_excel(rows):
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=list(NICHE_SCHEMA)).to_excel(buffer,
+                                                             index=False)
+    return buffer.getvalue()
+
+
+def main():
+    from homework_6 import run_ingest_job
+
+    content = sample_excel([SAMPLE_ROW, dict(SAMPLE_ROW, SKU=654321)])
+    saved = []
+    snapshots = []
+
+    def save(rows):
+        clean, report = validate_niche_batch(rows)
+        saved.extend(clean)
+        return report
+
+    fetch = Loader.fetch
+    Loader.fetch = lambda self, skip, category: content
+    try:
+        state = {}
+        run_ingest_job([(0, 1), (100, 1)], state, threading.Event(),
+                       save=save, snapshot=snapshots.extend)
+    finally:
+        Loader.fetch = fetch
+
+    assert state["status"] == "completed", state
+    assert state["tasks_failed"] == 0, state
+    assert state["rows_saved"] == 4 == len(saved), state
+    assert saved[0]["sku"] == "123456", saved[0]
+    assert len(snapshots) == 4, snapshots
+    print(f"ingest job ok: {state['rows_saved']} rows saved")
+
+
+if __name__ == "__main__":
+    main()
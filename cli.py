@@ -0,0 +1,187 @@
+import argparse
+import csv
+import json
+import sys
+
+
+DEFAULT_CATEGORIES = list(range(1, 20))
+
+EXPORT_TABLES = ["Suppliers", "Goods", "Orders", "BrandTurnover",
+                 "CategoryMissedRevenue", "SupplierLeaderboard"]
+
+
+def add_connection_arguments(parser):
+    parser.add_argument("--sql-type", default="PostgresSQL",
+                        choices=["PostgresSQL", "MSSQL"])
+    parser.add_argument("--server", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--db-name", default="synergy")
+
+
+def build_session_builder(homework, args):
+    connection = homework.Connection(
+        server=args.server,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        db_name=args.db_name,
+        sql_type=args.sql_type
+    )
+    return homework.SessionBuilder(connection)
+
+
+def build_session(homework, args):
+    session_builder = build_session_builder(homework, args)
+    homework.create_schema(session_builder.engine)
+    return session_builder.build()
+
+
+def crawl(args):
+    import asyncio
+    from parsing import load_and_transform_data
+
+    return asyncio.run(load_and_transform_data(args.categories, args.skip,
+                                               args.snapshot_dir))
+
+
+def run_crawl(args):
+    data = crawl(args)
+    output = open(args.output, "w", encoding="utf-8") if args.output \
+        else sys.stdout
+    try:
+        json.dump(data, output, ensure_ascii=False, default=str)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Загружено {len(data)} записей.", file=sys.stderr)
+
+
+def run_ingest(args):
+    from parsing import load_homework
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            data = json.load(f)
+        if args.snapshot_dir:
+            from snapshots import write_snapshot
+
+            write_snapshot(data, args.snapshot_dir)
+    else:
+        data = crawl(args)
+
+    homework = load_homework("5 homework.py")
+    db_session = build_session(homework, args)
+    try:
+        if data:
+            homework.populate_db_from_loader(db_session, data)
+    finally:
+        db_session.close()
+
+
+def run_seed(args):
+    from parsing import load_homework
+
+    homework = load_homework("5 homework.py")
+    session_builder = build_session_builder(homework, args)
+    homework.create_schema(session_builder.engine)
+    homework.bulk_seed_database(session_builder.engine,
+                                num_entries=args.rows,
+                                batch_size=args.batch_size,
+                                num_suppliers=args.suppliers,
+                                seed=args.seed,
+                                defer_indexes=not args.keep_indexes)
+
+
+def run_serve(args):
+    import uvicorn
+
+    uvicorn.run("homework_6:app", host=args.host, port=args.port)
+
+
+def run_export(args):
+    from parsing import load_homework
+
+    homework = load_homework("5 homework.py")
+    table_class = getattr(homework, args.table)
+    columns = table_class.__table__.c.keys()
+    db_session = build_session(homework, args)
+    output = open(args.output, "w", encoding="utf-8", newline="") \
+        if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for item in db_session.query(table_class).yield_per(1000):
+            writer.writerow([getattr(item, column) for column in columns])
+    finally:
+        db_session.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Загрузка, сохранение и выдача данных по нишам.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser(
+        "crawl", help="скачать данные по категориям и вывести JSON")
+    crawl_parser.add_argument("--categories", type=int, nargs="+",
+                              default=DEFAULT_CATEGORIES)
+    crawl_parser.add_argument("--skip", type=int, default=0)
+    crawl_parser.add_argument("--output")
+    crawl_parser.add_argument("--snapshot-dir",
+                              help="каталог срезов Parquet (по умолчанию "
+                                   "$SNAPSHOT_DIR или snapshots, пустая "
+                                   "строка отключает)")
+    crawl_parser.set_defaults(handler=run_crawl)
+
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="скачать (или прочитать из JSON) и сохранить в БД")
+    ingest_parser.add_argument("--categories", type=int, nargs="+",
+                               default=DEFAULT_CATEGORIES)
+    ingest_parser.add_argument("--skip", type=int, default=0)
+    ingest_parser.add_argument("--input",
+                               help="JSON, сохранённый командой crawl")
+    ingest_parser.add_argument("--snapshot-dir",
+                               help="каталог срезов Parquet (по умолчанию "
+                                    "$SNAPSHOT_DIR или snapshots; для "
+                                    "--input только если указан явно)")
+    add_connection_arguments(ingest_parser)
+    ingest_parser.set_defaults(handler=run_ingest)
+
+    seed_parser = subparsers.add_parser(
+        "seed", help="заполнить таблицы синтетическими данными")
+    seed_parser.add_argument("--rows", type=int, default=1_000_000)
+    seed_parser.add_argument("--batch-size", type=int, default=100_000)
+    seed_parser.add_argument("--suppliers", type=int)
+    seed_parser.add_argument("--seed", type=int)
+    seed_parser.add_argument("--keep-indexes", action="store_true",
+                             help="не пересоздавать индексы и внешние ключи "
+                                  "Goods после загрузки")
+    add_connection_arguments(seed_parser)
+    seed_parser.set_defaults(handler=run_seed)
+
+    serve_parser = subparsers.add_parser("serve", help="запустить API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.set_defaults(handler=run_serve)
+
+    export_parser = subparsers.add_parser(
+        "export", help="выгрузить таблицу из БД в CSV")
+    export_parser.add_argument("table", choices=EXPORT_TABLES)
+    export_parser.add_argument("--output")
+    add_connection_arguments(export_parser)
+    export_parser.set_defaults(handler=run_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
-from fastapi import FastAPI, Depends, HTTPException
+import bisect
+import functools
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, Depends, HTTPException, Query
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Mapped, \
     mapped_column, Session
-from typing import Annotated, List
-from pydantic import BaseModel
+from typing import Annotated, List, Optional
+from pydantic import BaseModel, Field, model_validator
+from parsing import Loader, load_homework
 
 
 class Connection:
@@ -36,8 +45,20 @@ conn_params = Connection(
     db_name="synergy",
     sql_type="PostgresSQL"
 ).engine
-engine = create_engine(conn_params)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@functools.cache
+def get_engine():
+    return create_engine(conn_params)
+
+
+@functools.cache
+def get_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def SessionLocal():
+    return get_sessionmaker()()
 
 
 def get_db():
@@ -72,15 +93,576 @@ class SallerResponse(SallerBase):
         from_attributes = True
 
 
+homework_5 = load_homework("5 homework.py")
+BrandTurnover = homework_5.BrandTurnover
+CategoryMissedRevenue = homework_5.CategoryMissedRevenue
+SupplierLeaderboard = homework_5.SupplierLeaderboard
+
+
+class BrandTurnoverResponse(BaseModel):
+    brand: str
+    turnover: int
+    orders_count: int
+    goods_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class CategoryMissedRevenueResponse(BaseModel):
+    main_category: str
+    missed_revenue: int
+    missed_revenue_percent: float
+    goods_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SupplierLeaderboardResponse(BaseModel):
+    supplier_id: int
+    supplier_name: str
+    turnover: int
+    orders_count: int
+    goods_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SallerSearchResult(SallerResponse):
+    score: float
+
+
+class IngestRequest(BaseModel):
+    categories: List[int] = Field(min_length=1)
+    skip_start: int = Field(0, ge=0)
+    skip_stop: int = Field(100, gt=0)
+    skip_step: int = Field(100, gt=0)
+
+    @model_validator(mode="after")
+    def check_skip_range(self):
+        if self.skip_start >= self.skip_stop:
+            raise ValueError("skip_start must be less than skip_stop")
+        return self
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str
+    tasks_total: int
+    tasks_done: int
+    tasks_failed: int
+    rows_fetched: int
+    rows_saved: int
+    rows_rejected: int
+    bytes_downloaded: int
+    elapsed_seconds: float
+    rows_per_second: float
+    error: Optional[str] = None
+
+
+INGEST_WORKERS = 2
+INGEST_JOBS_KEPT = 100
+INGEST_JOB_TTL = 3600
+
+ingest_jobs = {}
+ingest_jobs_lock = threading.Lock()
+
+
+@functools.cache
+def get_ingest_context():
+    return multiprocessing.get_context("spawn")
+
+
+@functools.cache
+def get_ingest_manager():
+    return get_ingest_context().Manager()
+
+
+ingest_executor = None
+ingest_executor_lock = threading.Lock()
+
+
+def get_ingest_executor():
+    global ingest_executor
+    with ingest_executor_lock:
+        if ingest_executor is None:
+            ingest_executor = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS, mp_context=get_ingest_context())
+        return ingest_executor
+
+
+def reset_ingest_executor(executor):
+    global ingest_executor
+    with ingest_executor_lock:
+        if ingest_executor is executor:
+            ingest_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_ingest_job(job):
+    executor = get_ingest_executor()
+    try:
+        future = executor.submit(run_ingest_job, job.tasks, job.state,
+                                 job.cancel_event)
+    except BrokenProcessPool:
+        reset_ingest_executor(executor)
+        executor = get_ingest_executor()
+        future = executor.submit(run_ingest_job, job.tasks, job.state,
+                                 job.cancel_event)
+    job.future = future
+    future.add_done_callback(
+        functools.partial(finish_ingest_job, job, executor))
+
+
+def finish_ingest_job(job, executor, future):
+    error = None if future.cancelled() else future.exception()
+    if isinstance(error, BrokenProcessPool):
+        reset_ingest_executor(executor)
+    if job.state["finished"] is not None:
+        return
+    if future.cancelled():
+        job.state.update(status="cancelled", finished=time.time())
+    else:
+        job.state.update(status="failed",
+                         error=str(error) or "Ingest worker exited",
+                         finished=time.time())
+
+
+class IngestJob:
+
+    def __init__(self, tasks):
+        manager = get_ingest_manager()
+        self.job_id = uuid.uuid4().hex
+        self.tasks = tasks
+        self.created = time.time()
+        self.future = None
+        self.cancel_event = manager.Event()
+        self.state = manager.dict(
+            status="queued", tasks_done=0, tasks_failed=0, rows_fetched=0,
+            rows_saved=0, rows_rejected=0, bytes_downloaded=0, started=None,
+            finished=None, error=None)
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def is_finished(self):
+        return self.state["finished"] is not None
+
+    def stats(self):
+        state = self.state.copy()
+        if state["started"] is None:
+            elapsed = 0.0
+        else:
+            elapsed = (state["finished"] or time.time()) - state["started"]
+        return IngestJobResponse(
+            job_id=self.job_id,
+            status=state["status"],
+            tasks_total=len(self.tasks),
+            tasks_done=state["tasks_done"],
+            tasks_failed=state["tasks_failed"],
+            rows_fetched=state["rows_fetched"],
+            rows_saved=state["rows_saved"],
+            rows_rejected=state["rows_rejected"],
+            bytes_downloaded=state["bytes_downloaded"],
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(state["rows_saved"] / elapsed, 1)
+            if elapsed else 0.0,
+            error=state["error"],
+        )
+
+
+def save_ingest_rows(rows):
+    db = SessionLocal()
+    try:
+        return homework_5.populate_db_from_loader(db, rows)
+    finally:
+        db.close()
+
+
+def save_ingest_snapshot(rows):
+    from snapshots import write_snapshot
+
+    write_snapshot(rows)
+
+
+def run_ingest_job(tasks, state, cancel_event, save=save_ingest_rows,
+                   snapshot=save_ingest_snapshot):
+    if cancel_event.is_set():
+        state.update(status="cancelled", finished=time.time())
+        return
+
+    state.update(status="running", started=time.time())
+    counters = dict(tasks_done=0, tasks_failed=0, rows_fetched=0,
+                    rows_saved=0, rows_rejected=0, bytes_downloaded=0)
+    status = "completed"
+    error = None
+    loader = Loader()
+    try:
+        for skip, category in tasks:
+            if cancel_event.is_set():
+                status = "cancelled"
+                break
+
+            try:
+                content = loader.fetch(skip, category)
+            except Exception as e:
+                counters["tasks_failed"] += 1
+                error = f"skip={skip}, category={category}: {e}"
+            else:
+                counters["bytes_downloaded"] += len(content)
+                rows = loader.save_dict([content])
+                counters["rows_fetched"] += len(rows)
+                if rows:
+                    try:
+                        snapshot(rows)
+                    except Exception as e:
+                        error = (f"snapshot skip={skip}, "
+                                 f"category={category}: {e}")
+                    report = save(rows)
+                    counters["rows_saved"] += report["accepted"]
+                    counters["rows_rejected"] += report["rejected"]
+            counters["tasks_done"] += 1
+            state.update(counters, error=error)
+
+        if status == "completed" and counters["tasks_failed"] == len(tasks):
+            status = "failed"
+    except Exception as e:
+        status = "failed"
+        error = str(e)
+    finally:
+        state.update(counters, status=status, error=error,
+                     finished=time.time())
+
+
+def prune_ingest_jobs():
+    now = time.time()
+    with ingest_jobs_lock:
+        finished = [job for job in ingest_jobs.values() if job.is_finished()]
+        finished.sort(key=lambda job: job.created)
+        excess = len(ingest_jobs) - INGEST_JOBS_KEPT
+        for job in finished:
+            if excess > 0 or now - job.created > INGEST_JOB_TTL:
+                del ingest_jobs[job.job_id]
+                excess -= 1
+
+
+def get_ingest_job(job_id: str):
+    with ingest_jobs_lock:
+        job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+
+class SellerTrigramData:
+
+    def __init__(self, sellers, normalize, chunk_size=200_000):
+        import numpy as np
+
+        self.ids = []
+        self.names = []
+        for id, name in sellers:
+            self.ids.append(id)
+            self.names.append(name)
+        keys = [normalize(name) for name in self.names]
+        self.slot_of = {id: slot for slot, id in enumerate(self.ids)}
+        self.alive = np.ones(len(keys), dtype=bool)
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.sorted_keys = [keys[slot] for slot in order]
+        self.sorted_slots = order
+
+        codes, slots = [], []
+        for start in range(0, len(keys), chunk_size):
+            chunk_codes, chunk_slots = self._encode_trigrams(
+                keys[start:start + chunk_size], start)
+            codes.append(chunk_codes)
+            slots.append(chunk_slots)
+        codes = np.concatenate(codes) if codes else np.empty(0, np.int64)
+        slots = np.concatenate(slots) if slots else np.empty(0, np.int32)
+
+        order = np.lexsort((slots, codes))
+        codes, slots = codes[order], slots[order]
+        unique = np.ones(len(codes), dtype=bool)
+        unique[1:] = (codes[1:] != codes[:-1]) | (slots[1:] != slots[:-1])
+        codes, slots = codes[unique], slots[unique]
+
+        self.gram_codes, starts = np.unique(codes, return_index=True)
+        self.offsets = np.append(starts, len(codes))
+        self.postings = slots
+        self.gram_counts = np.bincount(slots, minlength=len(keys))
+
+        grams = np.repeat(np.arange(len(self.gram_codes), dtype=np.int32),
+                          np.diff(self.offsets))
+        self.slot_grams = grams[np.argsort(slots, kind="stable")]
+        self.slot_offsets = np.concatenate(
+            ([0], np.cumsum(self.gram_counts))).astype(np.int64)
+
+    @staticmethod
+    def _encode_trigrams(keys, first_slot):
+        import numpy as np
+
+        padded = [f"  {key} " for key in keys]
+        lengths = np.fromiter(map(len, padded), dtype=np.int64,
+                              count=len(padded))
+        chars = np.frombuffer("".join(padded).encode("utf-32-le"),
+                              dtype=np.uint32).astype(np.int64)
+        ends = np.cumsum(lengths)
+        owner = np.repeat(np.arange(len(padded)), lengths)
+        positions = np.arange(len(chars))
+        valid = positions + 2 < ends[owner]
+        positions = positions[valid]
+        codes = ((chars[positions] << 42) | (chars[positions + 1] << 21)
+                 | chars[positions + 2])
+        slots = (owner[valid] + first_slot).astype(np.int32)
+        return codes, slots
+
+
+class SellerIndex:
+
+    def __init__(self, min_similarity=0.3, max_posting=256, max_source=8,
+                 max_candidates=256, prefix_window=64, max_recent=128):
+        self.min_similarity = min_similarity
+        self.max_posting = max_posting
+        self.max_source = max_source
+        self.max_candidates = max_candidates
+        self.prefix_window = prefix_window
+        self.max_recent = max_recent
+        self.ready = False
+        self.data = None
+        self.recent = {}
+        self.load = None
+        self.building = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(name):
+        return " ".join(name.lower().split())
+
+    @staticmethod
+    def split_trigrams(key):
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def trigram_code(gram):
+        return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+    def build(self, sellers, pending=None):
+        if pending is None:
+            with self.lock:
+                pending = self.recent
+        data = SellerTrigramData(sellers, self.normalize)
+        with self.lock:
+            self.recent = {id: entry for id, entry in self.recent.items()
+                           if pending.get(id) is not entry}
+            for id in self.recent:
+                slot = data.slot_of.get(id)
+                if slot is not None:
+                    data.alive[slot] = False
+            self.data = data
+            self.ready = True
+
+    def build_in_background(self, load):
+        with self.lock:
+            self.load = load
+            if self.building:
+                return
+            self.building = True
+
+        def run():
+            rebuild = False
+            try:
+                with self.lock:
+                    pending = self.recent
+                self.build(load(), pending)
+            except Exception as e:
+                print(f"Ошибка построения индекса продавцов: {e}")
+            else:
+                with self.lock:
+                    rebuild = len(self.recent) > self.max_recent
+            finally:
+                with self.lock:
+                    self.building = False
+            if rebuild:
+                self.build_in_background(self.load)
+
+        threading.Thread(target=run, name="seller-index",
+                         daemon=True).start()
+
+    def update(self, id, name):
+        key = self.normalize(name)
+        entry = (name, key, self.split_trigrams(key))
+        with self.lock:
+            if self.data is not None:
+                slot = self.data.slot_of.get(id)
+                if slot is not None:
+                    self.data.alive[slot] = False
+            self.recent = {**self.recent, id: entry}
+            rebuild = (len(self.recent) > self.max_recent
+                       and self.load is not None)
+        if rebuild:
+            self.build_in_background(self.load)
+
+    @staticmethod
+    def similarity(hits, query_grams, name_grams):
+        coverage = hits / query_grams
+        jaccard = hits / (query_grams + name_grams - hits)
+        return (coverage + jaccard) / 2
+
+    def prefix_score(self, key, name_key):
+        return 2.0 if name_key == key else 1.0 + len(key) / len(name_key)
+
+    def _prefix_matches(self, data, key):
+        matches = {}
+        position = bisect.bisect_left(data.sorted_keys, key)
+        window = data.sorted_keys[position:position + self.prefix_window]
+        for offset, name_key in enumerate(window):
+            if not name_key.startswith(key):
+                break
+            slot = data.sorted_slots[position + offset]
+            if data.alive[slot]:
+                matches[data.ids[slot]] = (self.prefix_score(key, name_key),
+                                           data.names[slot])
+        return matches
+
+    def _fuzzy_matches(self, data, grams, limit):
+        import numpy as np
+
+        if not len(data.gram_codes):
+            return {}
+        codes = np.array([self.trigram_code(gram) for gram in grams],
+                         dtype=np.int64)
+        found = np.searchsorted(data.gram_codes, codes)
+        found = found[found < len(data.gram_codes)]
+        found = np.unique(found[np.isin(data.gram_codes[found], codes)])
+        if not len(found):
+            return {}
+
+        starts = data.offsets[found]
+        ends = data.offsets[found + 1]
+        order = np.argsort(ends - starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        rare = (ends - starts) <= self.max_posting
+        source = min(int(rare.sum()), self.max_source) or 1
+        min_source_hits = 2 if source >= 3 else 1
+
+        candidates = np.concatenate([
+            data.postings[start:min(end, start + self.max_posting)]
+            for start, end in zip(starts[:source], ends[:source])])
+        candidates, hits = np.unique(candidates, return_counts=True)
+        keep = hits >= min_source_hits
+        candidates, hits = candidates[keep], hits[keep]
+        if len(candidates) > self.max_candidates:
+            top = np.argpartition(-hits, self.max_candidates)
+            candidates = candidates[top[:self.max_candidates]]
+        if not len(candidates):
+            return {}
+
+        counts = data.gram_counts[candidates]
+        owner = np.repeat(np.arange(len(candidates)), counts)
+        positions = (np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+            + np.repeat(data.slot_offsets[candidates], counts))
+        matched = np.isin(data.slot_grams[positions], found)
+        hits = np.bincount(owner, weights=matched, minlength=len(candidates))
+
+        scores = self.similarity(hits, len(grams),
+                                 data.gram_counts[candidates])
+        keep = (scores >= self.min_similarity) & data.alive[candidates]
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        return {data.ids[slot]: (float(score), data.names[slot])
+                for slot, score in zip(candidates.tolist(), scores.tolist())}
+
+    def search(self, query, limit=10):
+        key = self.normalize(query)
+        if not key:
+            return []
+        data, recent = self.data, self.recent
+        grams = self.split_trigrams(key)
+
+        matches = self._prefix_matches(data, key) if data is not None else {}
+        for id, (name, name_key, name_grams) in recent.items():
+            if name_key.startswith(key):
+                matches[id] = (self.prefix_score(key, name_key), name)
+            else:
+                score = self.similarity(len(grams & name_grams), len(grams),
+                                        len(name_grams))
+                if score >= self.min_similarity:
+                    matches[id] = (score, name)
+        if data is not None and len(matches) < limit:
+            fuzzy = self._fuzzy_matches(data, grams, limit + len(matches))
+            for id, match in fuzzy.items():
+                matches.setdefault(id, match)
+
+        ranked = sorted(matches.items(), key=lambda item: item[1][0],
+                        reverse=True)[:limit]
+        return [SallerSearchResult(id=id, saller_name=name,
+                                   score=round(score, 4))
+                for id, (score, name) in ranked]
+
+
+def load_sellers():
+    db = SessionLocal()
+    try:
+        return db.query(Sallers.id, Sallers.saller_name).all()
+    finally:
+        db.close()
+
+
+seller_index = SellerIndex()
+
 app = FastAPI()
 
 
+@app.post("/ingest", response_model=IngestJobResponse, status_code=202)
+def start_ingest(request: IngestRequest):
+    tasks = [(skip, category)
+             for category in request.categories
+             for skip in range(request.skip_start, request.skip_stop,
+                               request.skip_step)]
+    prune_ingest_jobs()
+    job = IngestJob(tasks)
+    with ingest_jobs_lock:
+        ingest_jobs[job.job_id] = job
+    submit_ingest_job(job)
+    return job.stats()
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJobResponse)
+def get_ingest_status(job_id: str):
+    return get_ingest_job(job_id).stats()
+
+
+@app.delete("/ingest/{job_id}", response_model=IngestJobResponse)
+def cancel_ingest(job_id: str):
+    job = get_ingest_job(job_id)
+    job.cancel()
+    return job.stats()
+
+
 @app.get("/sallers", response_model=List[SallerResponse])
 def get_sellers(db: Session = Depends(get_db)):
     result = db.query(Sallers).all()
     return result
 
 
+@app.get("/sallers/search", response_model=List[SallerSearchResult])
+def search_sellers(q: str = Query(min_length=1, max_length=200),
+                   limit: int = Query(10, ge=1, le=100)):
+    if not seller_index.ready:
+        raise HTTPException(status_code=503,
+                            detail="Seller index is still building")
+    return seller_index.search(q, limit)
+
+
 @app.get("/sallers/{id}", response_model=SallerResponse)
 def get_seller(id: int, db: Session = Depends(get_db)):
     result = db.query(Sallers).filter(Sallers.id == id).first()
@@ -98,9 +680,37 @@ def update_seller(id: int, updated_data: SallerBase, db: Session = Depends(get_d
     seller.saller_name = updated_data.saller_name
     db.commit()
     db.refresh(seller)
+    seller_index.update(seller.id, seller.saller_name)
     return seller
 
 
+@app.get("/analytics/brands/top",
+         response_model=List[BrandTurnoverResponse])
+def get_top_brands(limit: int = Query(10, ge=1, le=1000),
+                   db: Session = Depends(get_db)):
+    return (db.query(BrandTurnover)
+            .order_by(BrandTurnover.turnover.desc())
+            .limit(limit).all())
+
+
+@app.get("/analytics/categories/missed-revenue",
+         response_model=List[CategoryMissedRevenueResponse])
+def get_missed_revenue_by_category(limit: int = Query(10, ge=1, le=1000),
+                                   db: Session = Depends(get_db)):
+    return (db.query(CategoryMissedRevenue)
+            .order_by(CategoryMissedRevenue.missed_revenue_percent.desc())
+            .limit(limit).all())
+
+
+@app.get("/analytics/suppliers/leaderboard",
+         response_model=List[SupplierLeaderboardResponse])
+def get_supplier_leaderboard(limit: int = Query(10, ge=1, le=1000),
+                             db: Session = Depends(get_db)):
+    return (db.query(SupplierLeaderboard)
+            .order_by(SupplierLeaderboard.turnover.desc())
+            .limit(limit).all())
+
+
 def create_test_data(db: Session):
     if db.query(Sallers).count() == 0:
         print("Таблица Sallers пуста. Добавляем тестовые данные.")
@@ -114,7 +724,8 @@ def create_test_data(db: Session):
 
 @app.on_event("startup")
 def on_startup():
-    BaseTable.metadata.create_all(bind=engine)
+    BaseTable.metadata.create_all(bind=get_engine())
+    homework_5.create_schema(get_engine())
     print("Database tables ensured.")
 
     db = SessionLocal()
@@ -122,3 +733,14 @@ def on_startup():
         create_test_data(db)
     finally:
         db.close()
+    seller_index.build_in_background(load_sellers)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    with ingest_jobs_lock:
+        jobs = list(ingest_jobs.values())
+    for job in jobs:
+        job.cancel()
+    if ingest_executor is not None:
+        reset_ingest_executor(ingest_executor)
@@ -1,7 +1,8 @@
 import asyncio
+import importlib.util
 import io
-import requests
-import pandas as pd
+import os
+import sys
 from abc import ABC, abstractmethod
 
 
@@ -36,7 +37,9 @@ class Loader(Model):
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self._sync_download, skip, category)
 
-    def _sync_download(self, skip, category):
+    def fetch(self, skip, category):
+        import requests
+
         url = self.url + (
             f"?skip={skip}"
             "&price_min=0&price_max=1060225"
@@ -47,15 +50,22 @@ class Loader(Model):
             "&trend=false&sort=sum_sale&sort_dir=-1"
             f"&id_cat={category}"
         )
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        return response.content
+
+    def _sync_download(self, skip, category):
+        import requests
+
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.content
+            return self.fetch(skip, category)
         except requests.RequestException as e:
             print(f"Ошибка при скачивании данных для категории {category}: {e}")
             return b''
 
     def save_dict(self, data_list):
+        import pandas as pd
+
         results = []
         for data in data_list:
             if len(data) > 0:
@@ -69,8 +79,92 @@ class Loader(Model):
         return results
 
 
-async def load_and_transform_data(categories_range, skip_value):
+def load_homework(filename):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    name = "homework_" + os.path.splitext(filename)[0].replace(" ", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+NICHE_SCHEMA = {
+    'Продавец': ('seller_name', 'str'),
+    'Название': ('item_name', 'str'),
+    'Цена': ('price', 'int'),
+    'SKU': ('sku', 'str'),
+    'Бренд': ('brand', 'str'),
+    'Основная категория': ('main_category', 'str'),
+    'Кол-во дней когда артикул был в продаже': ('days_on_sale', 'int'),
+    'Кол-во дней, когда артикул покупали': ('days_with_purchases', 'int'),
+    'Кол-во заказов': ('total_orders_count', 'int'),
+    'Оборот FBO': ('turnover_fbo', 'int'),
+    'Оборот FBS': ('turnover_fbs', 'int'),
+    'Упущенная выгода': ('missed_revenue', 'int'),
+    'Последние остатки на складах': ('last_stock_balance', 'int'),
+    'Упущенная выгода в процентах': ('missed_revenue_percent', 'float'),
+    'Отзывов': ('feedback_count', 'int'),
+    'Поисковых запросов': ('search_queries', 'int'),
+}
+
+
+def validate_niche_batch(data, schema=NICHE_SCHEMA, sample_size=10):
+    import pandas as pd
+
+    df = pd.DataFrame(data, dtype=object)
+    report = {
+        "total": len(df),
+        "accepted": 0,
+        "rejected": len(df),
+        "missing_columns": [name for name in schema
+                            if not df.empty and name not in df.columns],
+        "invalid": {},
+        "sample": [],
+    }
+    if df.empty or report["missing_columns"]:
+        return [], report
+
+    rejected = pd.Series(False, index=df.index)
+    columns = {}
+    for source, (target, kind) in schema.items():
+        column = df[source]
+        if kind == 'str':
+            invalid = column.isna()
+            columns[target] = column.astype(str)
+        else:
+            column = pd.to_numeric(column, errors='coerce')
+            invalid = column.isna() | column.abs().eq(float('inf'))
+            if kind == 'int':
+                invalid |= column.ne(column.round())
+            columns[target] = column
+        if invalid.any():
+            report["invalid"][source] = int(invalid.sum())
+            rejected |= invalid
+
+    dtypes = {'str': 'object', 'int': 'int64', 'float': 'float64'}
+    clean = pd.DataFrame(columns)[~rejected].astype(
+        {target: dtypes[kind] for target, kind in schema.values()})
+
+    report["accepted"] = len(clean)
+    report["rejected"] = report["total"] - report["accepted"]
+    report["sample"] = df.index[rejected][:sample_size].tolist()
+    return clean.to_dict(orient="records"), report
+
+
+async def load_and_transform_data(categories_range, skip_value,
+                                  snapshot_dir=None):
     loader = Loader()
     binary_data = await loader.download_async(skip_value, categories_range)
     transformed_data = loader.save_dict(binary_data)
+    if transformed_data:
+        from snapshots import write_snapshot
+
+        write_snapshot(transformed_data, snapshot_dir)
     return transformed_data
\ No newline at end of file
@@ -0,0 +1,114 @@
+import datetime
+import os
+import uuid
+from parsing import validate_niche_batch
+
+
+PARTITION_COLUMNS = ["snapshot_date", "main_category"]
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+
+
+class SnapshotStore:
+
+    def __init__(self, root):
+        self.root = root
+
+    @property
+    def partitioning(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        return ds.partitioning(
+            pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+            flavor="hive")
+
+    def write(self, data, snapshot_date=None):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        rows, report = validate_niche_batch(data)
+        if not rows:
+            return report
+
+        snapshot_date = snapshot_date or datetime.date.today()
+        df = pd.DataFrame.from_records(rows)
+        df["snapshot_date"] = snapshot_date.isoformat()
+        df["crawled_at"] = pd.Timestamp.now(tz="UTC")
+
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            self.root,
+            format="parquet",
+            partitioning=self.partitioning,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return report
+
+    def query(self, columns=None, start=None, end=None, categories=None,
+              filters=None):
+        import pandas as pd
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or [])
+
+        conditions = []
+        if start is not None:
+            conditions.append(("snapshot_date", ">=", start.isoformat()))
+        if end is not None:
+            conditions.append(("snapshot_date", "<=", end.isoformat()))
+        if categories is not None:
+            conditions.append(("main_category", "in", list(categories)))
+        conditions.extend(filters or [])
+
+        expression = None
+        for column, op, value in conditions:
+            condition = _filter_expression(ds.field(column), op, value)
+            expression = condition if expression is None \
+                else expression & condition
+
+        dataset = ds.dataset(self.root, format="parquet",
+                             partitioning=self.partitioning)
+        table = dataset.to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+
+    def sku_history(self, sku, days=30, columns=None, today=None):
+        today = today or datetime.date.today()
+        columns = columns or ["snapshot_date", "crawled_at", "sku", "price",
+                              "total_orders_count", "turnover_fbo",
+                              "turnover_fbs", "last_stock_balance"]
+        df = self.query(columns=columns,
+                        start=today - datetime.timedelta(days=days),
+                        end=today,
+                        filters=[("sku", "==", str(sku))])
+        order = [name for name in ("snapshot_date", "crawled_at")
+                 if name in df.columns]
+        return df.sort_values(order, ignore_index=True)
+
+
+def write_snapshot(data, root=None):
+    root = DEFAULT_SNAPSHOT_DIR if root is None else root
+    if not root:
+        return None
+    return SnapshotStore(root).write(data)
+
+
+def _filter_expression(field, op, value):
+    if op == "==":
+        return field == value
+    if op == "!=":
+        return field != value
+    if op == "<":
+        return field < value
+    if op == "<=":
+        return field <= value
+    if op == ">":
+        return field > value
+    if op == ">=":
+        return field >= value
+    if op == "in":
+        return field.isin(value)
+    raise ValueError(f"Unsupported filter operator: {op}")